@@ -2,17 +2,16 @@ import tkinter as tk
 from tkinter import ttk, messagebox, font
 
 import tobii_research as tr
-import time
-import math
-from math import isnan, copysign, isclose
+from math import isnan
 import random
-from enum import Enum
-from functools import partial
+from collections import deque
 
 from screeninfo import get_monitors
 import pyaudio
+import numpy as np
 import wave
 import sys
+import threading
 from PIL import Image, ImageDraw
 from datetime import datetime
 import os
@@ -23,15 +22,15 @@ VERSION_MINOR = 0
 FAKE_CALIBRATION = False  # allows calibration to run without eyetracker connection for testing
 CALIBRATION_SOUND = 'calib_sound.wav'
 
-class CalibrationState(Enum):
-    MOVING = 1
-    SHRINKING = 2
-    GROWING = 3
+CALIBRATION_DELAY = 50  # ms between frames of the calibration animation
+CALIBRATION_STEP = 0.02  # distance the calib guide dot moves per frame, as a fraction of canvas width/height
+CALIBRATION_STEP_R = 2  # px change in calib guide dot radius per frame
 
+GAZE_REFRESH_INTERVAL = 16  # ms between updates of the gaze display in the main window
 
-CALIBRATION_AUDIO_DEVICE = 4  # Index of the audio device to use for calibration sounds (in range(PyAudio().get_device_count())
+SOUND_WRITE_TIMEOUT = 3  # s to wait for the calibration sound to finish playing when closing the calibration
 
-is_close = partial(isclose, abs_tol=0.001)
+CALIBRATION_AUDIO_DEVICE = 4  # Index of the audio device to use for calibration sounds (in range(PyAudio().get_device_count())
 
 class MainApp:
     def __init__(self, parent):
@@ -45,21 +44,19 @@ class MainApp:
         self.root.minsize(500, 500)
 
         self.et = None  # eyetracker object
+        self.eyetrackers = []  # eyetrackers listed in the combobox
         self.calibration = None  # calibration object
         self.wavdata = b''
-        self.sound_cursor = 0
         self.pyaudio = None
-
-        # variables for plotting gaze and eyes in the main window canvas
-        self.gaze = None
-        self.eye_left = None
-        self.eye_right = None
+        self.sound_stream = None  # audio output stream, open during calibration
+        self.sound_thread = None  # thread writing the sound to sound_stream
+        self.gaze_queue = deque(maxlen=1)  # newest gaze sample from the eyetracker thread, waiting to be displayed
 
         # variables for widgets
         self.et_var = tk.StringVar()
         self.eye_var = tk.IntVar()
         self.gaze_var = tk.IntVar()
-        self.dist_var = tk.IntVar()
+        self.dist_var = tk.DoubleVar(value=50)
         self.screen_var = tk.StringVar()
 
         self.build_layout()
@@ -69,6 +66,7 @@ class MainApp:
         self.find_screens()
 
         self.callback_enabled = True
+        self.drain_gaze()
 
     def prepare_to_close(self):
         self.callback_enabled = False
@@ -98,6 +96,8 @@ class MainApp:
 
         self.canvas = tk.Canvas(self.root)
         self.canvas.grid(row=2, column=1, sticky='nsew')
+        self.canvas_width = self.canvas_height = 1
+        self.canvas.bind('<Configure>', self.canvas_resized)
 
         self.bottom_frame = tk.Frame(self.root)
         self.bottom_frame.grid(row=3, column=1, sticky='nsew')
@@ -112,6 +112,11 @@ class MainApp:
 
         self.canvas.configure(bg='white')
 
+        # gaze and eye markers are created once (off-canvas) and then moved as data arrives
+        self.gaze = self.canvas.create_oval(-20, -20, -10, -10, fill='red')
+        self.eye_left = self.canvas.create_oval(-20, -20, -10, -10, fill='black', outline='blue', width=4)
+        self.eye_right = self.canvas.create_oval(-20, -20, -10, -10, fill='black', outline='blue', width=4)
+
 
         # top controls
 
@@ -132,9 +137,8 @@ class MainApp:
 
         self.gaze_chk = tk.Checkbutton(self.bottom_frame, text='Gaze', variable=self.gaze_var)
         self.gaze_chk.grid(row=0, column=1, sticky='nsew')
-        self.dist_bar = ttk.Progressbar(self.bottom_frame, mode='determinate', value=0)
+        self.dist_bar = ttk.Progressbar(self.bottom_frame, mode='determinate', variable=self.dist_var)
         self.dist_bar.grid(row=0, column=2, sticky='nsew')
-        self.dist_bar['value'] = 50
 
         #ttk.Label(self.bottom_frame, text='Screen').grid(row=1, column=0, sticky='nsew')
         self.screen_btn = ttk.Button(self.bottom_frame, text='Screen', command=self.identify_screens)
@@ -146,9 +150,15 @@ class MainApp:
         #self.calibrate_btn = ttk.Button(self.bottom_frame, text='Calibrate', command=self.test_calibration_plot)
         self.calibrate_btn.grid(row=1, column=2, sticky='nsew')
 
+    def canvas_resized(self, e):
+        # keep track of the canvas size so that it need not be queried for every gaze sample
+        self.canvas_width = e.width
+        self.canvas_height = e.height
+
     def find_eyetrackers(self, e=None):
         # find the list of available eyetrackers
         eyetrackers = tr.find_all_eyetrackers()
+        self.eyetrackers = eyetrackers  # combobox entries are in the same order
 
         et_labels = ['_'.join([et.model, et.serial_number]) for et in eyetrackers]
 
@@ -178,13 +188,9 @@ class MainApp:
     def select_eyetracker(self, e=None):
         selected_idx = self.et_combo.current()
 
-        serial_number = self.et_var.get().split('_', 1)[1]
-
-        # search by serial number
-        eyetrackers = tr.find_all_eyetrackers()
-        selected_et = [et for et in eyetrackers if et.serial_number == serial_number]
-        if selected_et:
-            self.et = selected_et[0]
+        # use the eyetrackers found when the combobox was populated rather than searching again
+        if 0 <= selected_idx < len(self.eyetrackers):
+            self.et = self.eyetrackers[selected_idx]
             # subscribe to ET events
             self.et.subscribe_to(tr.EYETRACKER_GAZE_DATA, self.gaze_data_callback, as_dictionary=True)
 
@@ -193,57 +199,77 @@ class MainApp:
 
 
     def gaze_data_callback(self, data):
+        """Called by the eyetracker SDK on its own thread for each gaze sample.
+
+        Only computes the values to display and queues them; Tk widgets are updated from the main loop
+        by drain_gaze.
+        """
 
         # need to be able to short-circuit the callback to enable a clean exit
         if not self.callback_enabled:
             return
-        
-        self.canvas_width = self.canvas.winfo_width()
-        self.canvas_height = self.canvas.winfo_height()
-
-        #print(f'{self.canvas_width=}, {self.canvas_height=}')
-
-        if self.gaze_var.get() == 1:
-            gaze_left = data['left_gaze_point_on_display_area']
-            gaze_right = data['right_gaze_point_on_display_area']
-            #print(f'gaze left = {gaze_left}, gaze_right = {gaze_right}')
-            if isnan(gaze_left[0]) and isnan(gaze_right[0]):
-                pass  # no data to plot
-            elif isnan(gaze_left[0]):
-                self.plot_gaze(*gaze_right)
-            elif isnan(gaze_right[0]):
-                self.plot_gaze(*gaze_left)
-            else:
-                # compute average of left and right eye gaze positions
-                self.plot_gaze((gaze_left[0] + gaze_right[0])/2,
-                               (gaze_left[1] + gaze_right[1])/2)
-
-
-        if self.eye_var.get() == 1:
-            # plot eye position
-            # the trackbox coordinate system has its origin in the (forward) upper right, increasing down and left
-            left_eye_x, left_eye_y = data['left_gaze_origin_in_trackbox_coordinate_system'][:2]
-            right_eye_x, right_eye_y = data['right_gaze_origin_in_trackbox_coordinate_system'][:2]
-            self.plot_eyes(1-left_eye_x, left_eye_y, 1-right_eye_x, right_eye_y)
-
-        # Update dist_bar to show position in z-coordinates track box coordinate system
-        # (normalized with 0 closest to ET and 1 farthest)
 
-        # position in track box
-        left_eye_z = data['left_gaze_origin_in_trackbox_coordinate_system'][2]
-        right_eye_z = data['right_gaze_origin_in_trackbox_coordinate_system'][2]
+        gaze_left = data['left_gaze_point_on_display_area']
+        gaze_right = data['right_gaze_point_on_display_area']
+        #print(f'gaze left = {gaze_left}, gaze_right = {gaze_right}')
+
+        # eye position
+        # the trackbox coordinate system has its origin in the (forward) upper right, increasing down and left
+        left_eye_x, left_eye_y, left_eye_z = data['left_gaze_origin_in_trackbox_coordinate_system']
+        right_eye_x, right_eye_y, right_eye_z = data['right_gaze_origin_in_trackbox_coordinate_system']
+        # None for an eye without data, since NaN coordinates cannot be drawn
+        eye_left = None if isnan(left_eye_x) else (1-left_eye_x, left_eye_y)
+        eye_right = None if isnan(right_eye_x) else (1-right_eye_x, right_eye_y)
+
+        if isnan(gaze_left[0]) and isnan(gaze_right[0]):
+            gaze = None  # no data to plot
+        elif isnan(gaze_left[0]):
+            gaze = gaze_right
+        elif isnan(gaze_right[0]):
+            gaze = gaze_left
+        else:
+            # compute average of left and right eye gaze positions
+            gaze = ((gaze_left[0] + gaze_right[0])/2,
+                    (gaze_left[1] + gaze_right[1])/2)
 
+        # position in z-coordinates track box coordinate system
+        # (normalized with 0 closest to ET and 1 farthest)
         if isnan(left_eye_z) and isnan(right_eye_z):
-            self.dist_bar['value'] = 0  # maybe should signify no track somehow (color?)
+            dist = 0  # maybe should signify no track somehow (color?)
         elif isnan(left_eye_z):
-            self.dist_bar['value'] = 100 * right_eye_z
+            dist = 100 * right_eye_z
         elif isnan(right_eye_z):
-            self.dist_bar['value'] = 100 * left_eye_z
+            dist = 100 * left_eye_z
         else:
             # neither left nor right are nan, so use average
-            self.dist_bar['value'] = 50 * (left_eye_z + right_eye_z)
+            dist = 50 * (left_eye_z + right_eye_z)
 
+        self.gaze_queue.append((gaze, eye_left, eye_right, dist))
 
+    def drain_gaze(self):
+        """Display the most recent queued gaze sample.  Runs periodically in the Tk main loop."""
+        if not self.callback_enabled:
+            return
+
+        try:
+            # the queue holds only the newest sample (older ones are superseded), so a single popleft takes it
+            # atomically with respect to the eyetracker thread
+            try:
+                gaze, eye_left, eye_right, dist = self.gaze_queue.popleft()
+            except IndexError:
+                return  # no new sample since the last update
+
+            if gaze is not None and self.gaze_var.get() == 1:
+                self.plot_gaze(*gaze)
+
+            if self.eye_var.get() == 1:
+                self.plot_eyes(eye_left, eye_right)
+
+            # Update dist_bar to show position in track box
+            self.dist_var.set(dist)
+        finally:
+            # reschedule even if displaying this sample failed, so that the display keeps updating
+            self.root.after(GAZE_REFRESH_INTERVAL, self.drain_gaze)
 
     #
     # sample_gaze_data = {
@@ -272,28 +298,21 @@ class MainApp:
         R = 10
         X = x * self.canvas_width
         Y = y * self.canvas_height
-        if self.gaze:
-            self.canvas.coords(self.gaze, X-R, Y-R, X+R, Y+R)
-        else:
-            self.gaze = self.canvas.create_oval(X-R, Y-R, X+R, Y+R, fill='red')
-        
-    def plot_eyes(self, x1, y1, x2, y2):
-        """Draw the eye positions in the main window canvas"""
+        self.canvas.coords(self.gaze, X-R, Y-R, X+R, Y+R)
+
+    def plot_eyes(self, left, right):
+        """Draw the eye positions in the main window canvas
+
+        :param left: (x, y) position of the left eye in normalized coordinates (0-1), or None if not tracked
+        :param right: (x, y) position of the right eye in normalized coordinates (0-1), or None if not tracked
+        """
         R = 10
-        X1 = x1 * self.canvas_width
-        Y1 = y1 * self.canvas_height
-        X2 = x2 * self.canvas_width
-        Y2 = y2 * self.canvas_height
-        
-        if self.eye_left:
-            self.canvas.coords(self.eye_left, X1-R, Y1-R, X1+R, Y1+R)
-        else:
-            self.eye_left = self.canvas.create_oval(X1-R, Y1-R, X1+R, Y1+R, fill='black', outline='blue', width=4)
-        
-        if self.eye_right:
-            self.canvas.coords(self.eye_right, X2-R, Y2-R, X2+R, Y2+R)
-        else:
-            self.eye_right = self.canvas.create_oval(X2-R, Y2-R, X2+R, Y2+R, fill='black', outline='blue', width=4)
+        for eye, pos in ((self.eye_left, left), (self.eye_right, right)):
+            if pos is None:
+                continue  # leave the marker where it was last seen
+            X = pos[0] * self.canvas_width
+            Y = pos[1] * self.canvas_height
+            self.canvas.coords(eye, X-R, Y-R, X+R, Y+R)
         
         
 
@@ -307,13 +326,28 @@ class MainApp:
         #
         # return
 
-        self.pyaudio = pyaudio.PyAudio()
-
-        # Create a calibration window fullscreen on the selected monitor.
+        # find the selected monitor
         screens = get_monitors()
         screen = [s for s in screens if s.name == self.screen_cbo.get()][0]
         # notable properties of screen include x, y, width, height
 
+        self.pyaudio = pyaudio.PyAudio()
+        # open the output stream once for the whole calibration, since opening a stream can take a noticeable time.
+        # This is done after the screen lookup but before the calibration window is created or calibration mode is
+        # entered, so that a failure here leaves nothing else to clean up.  It is closed by close_calibration.
+        try:
+            self.sound_stream = self.pyaudio.open(format=self.pyaudio.get_format_from_width(self.wave_samplewidth),
+                                                  channels=self.wave_channels,
+                                                  rate=int(self.wave_framerate),
+                                                  output=True,
+                                                  output_device_index=CALIBRATION_AUDIO_DEVICE,
+                                                  frames_per_buffer=2048)
+        except Exception:
+            self.pyaudio.terminate()
+            raise
+        self.sound_thread = None  # a writer stalled on a previous calibration's stream must not block this one
+
+        # Create a calibration window fullscreen on the selected monitor.
         self.calib_window = tk.Toplevel(self.parent)  # create new toplevel window
         self.calib_window.geometry(f'{screen.width}x{screen.height}+{screen.x}+{screen.y}')  # position window on the selected screen
         self.calib_window.overrideredirect(True)  # no window decorations (e.g. titlebar, border)
@@ -324,7 +358,7 @@ class MainApp:
         self.calibcanvas = tk.Canvas(self.calib_window)
         self.calibcanvas.grid(row=0, column=0, sticky='nsew')
 
-        self.parent.update()
+        self.parent.update_idletasks()  # lay out the canvas so that its size can be read
         self.calib_width = self.calibcanvas.winfo_width()
         self.calib_height = self.calibcanvas.winfo_height()
 
@@ -333,102 +367,122 @@ class MainApp:
         self.calib_r_max = 30
         self.calib_r_min = 2
         self.calib_pos = [0.2, 0.6]  # initial position
-        self.calib_r = 30  # initial point radius
-        self.calib_index = 0  # index of next calibration point
-        self.calib_state = CalibrationState.MOVING
 
+        # targets and position in pixel coordinates, since the canvas size is fixed for the calibration
+        calib_size = np.array([self.calib_width, self.calib_height])
+        self.calib_targets_px = np.array(self.calib_targets) * calib_size
+        self.calib_pos_px = np.array(self.calib_pos) * calib_size
 
-        self.draw_calib_dot(*self.calib_pos, self.calib_r, create=True)
+        self.draw_calib_dot(*self.calib_pos_px, self.calib_r_max, create=True)
 
         if not FAKE_CALIBRATION:
             self.calibration = tr.ScreenBasedCalibration(self.et)
             self.calibration.enter_calibration_mode()
 
+        self.calib_steps = self.calibration_steps()
         self.run_calibration()
 
 
     def draw_calib_dot(self, x, y, r, create=False):
         """Draw the calib guide dot in the calibration canvas.
 
-        x, y supplied in normalized coordinates (0-1), and r is in pixels.
-        :param x: x-coordinate of guide dot in normalized coordinates (0-1)
-        :param y: y-coordinate of guide dot in normalized coordinates (0-1)
+        x, y, and r are all supplied in pixels.
+        :param x: x-coordinate of guide dot in pixels
+        :param y: y-coordinate of guide dot in pixels
         :param r: radius of guide dot in pixels
         :param create: If True, create new dot.  If False, reposition existing dot.
         """
-        xx = x * self.calib_width
-        yy = y * self.calib_height
         if create:
-            self.calib_dot = self.calibcanvas.create_oval(xx - r, yy - r, xx + r, yy + r, fill='red')
+            self.calib_dot = self.calibcanvas.create_oval(int(x - r), int(y - r), int(x + r), int(y + r), fill='red')
         else:
-            self.calibcanvas.coords(self.calib_dot, xx - r, yy - r, xx + r, yy + r)
+            self.calibcanvas.coords(self.calib_dot, int(x - r), int(y - r), int(x + r), int(y + r))
 
 
-    def run_calibration(self):
-        """
+    def calibration_steps(self):
+        """Generate the calibration trajectory, one animation frame per iteration.
+
         Calibration trajectory:
         move to target.
         shrink
         collect calibration data
         grow
         move to next target
+        """
+        shrink_radii = range(self.calib_r_max - CALIBRATION_STEP_R, self.calib_r_min - 1, -CALIBRATION_STEP_R)
+        grow_radii = range(self.calib_r_min + CALIBRATION_STEP_R, self.calib_r_max + 1, CALIBRATION_STEP_R)
 
-
-        :return:
+        draw_calib_dot = self.draw_calib_dot  # bound once, since it is called on every frame
+        if not FAKE_CALIBRATION:
+            collect_data = self.calibration.collect_data
+            success = tr.CALIBRATION_STATUS_SUCCESS
+        pos = self.calib_pos_px
+        for target, target_px in zip(self.calib_targets, self.calib_targets_px):
+            for pos in self.move_waypoints(pos, target_px):
+                draw_calib_dot(*pos, self.calib_r_max)
+                yield
+
+            self.play_sound()
+            yield
+
+            for r in shrink_radii:
+                draw_calib_dot(*pos, r)
+                yield
+
+            # collect calibration data (try a second time if the first time fails)
+            if not FAKE_CALIBRATION:
+                # calibration data is collected at the target in normalized coordinates
+                if collect_data(*target) != success:
+                    collect_data(*target)
+            yield
+
+            for r in grow_radii:
+                draw_calib_dot(*pos, r)
+                yield
+
+    def move_waypoints(self, start, target):
+        """Return the positions of the calib guide dot, one per frame, when moving from start to target.
+
+        Each coordinate moves by one step per frame until it reaches the target, so the dot travels diagonally
+        and then straight if the distances along x and y differ.
+        :param start: (x, y) starting position in pixels
+        :param target: (x, y) target position in pixels
+        :return: array of (x, y) positions in pixels with one row per frame, ending at target
         """
-        DELAY = 50  # ms
-        STEP = 0.02
-        STEP_R = 2  # px
-
-
-        if self.calib_state == CalibrationState.MOVING:
-            if (is_close(self.calib_pos[0], self.calib_targets[self.calib_index][0])
-                    and is_close(self.calib_pos[1], self.calib_targets[self.calib_index][1])):
-                self.calib_state = CalibrationState.SHRINKING
-                self.play_sound()
-            else:
-                # move
-                diff_x = self.calib_targets[self.calib_index][0] - self.calib_pos[0]
-                diff_y = self.calib_targets[self.calib_index][1] - self.calib_pos[1]
-                if not is_close(diff_x, 0) :
-                    self.calib_pos[0] += copysign(STEP, diff_x)
-                if not is_close(diff_y, 0):
-                    self.calib_pos[1] += copysign(STEP, diff_y)
-
-                self.draw_calib_dot(*self.calib_pos, self.calib_r)
-
-        elif self.calib_state == CalibrationState.SHRINKING:
-            if is_close(self.calib_r, self.calib_r_min):
-
-                # collect calibration data (try a second time if the first time fails)
-                if not FAKE_CALIBRATION:
-                    if self.calibration.collect_data(*self.calib_pos) != tr.CALIBRATION_STATUS_SUCCESS:
-                        self.calibration.collect_data(*self.calib_pos)
-
-                self.calib_state = CalibrationState.GROWING
-            else:
-                self.calib_r -= STEP_R
-                self.draw_calib_dot(*self.calib_pos, self.calib_r)
-
-        elif self.calib_state == CalibrationState.GROWING:
-            if is_close(self.calib_r, self.calib_r_max):
-                if self.calib_index == len(self.calib_targets) - 1:
-                    # Done with calibration!
-                    self.close_calibration()
-                    return
-                else:
-                    self.calib_index += 1
-                    self.calib_state = CalibrationState.MOVING
-            else:
-                self.calib_r += STEP_R
-                self.draw_calib_dot(*self.calib_pos, self.calib_r)
-        else:
-            raise Exception(f'Invalid calibration state: {self.calib_state}')
+        step = CALIBRATION_STEP * np.array([self.calib_width, self.calib_height])
+
+        # number of whole steps to take along each axis (negative when moving left/up)
+        steps = np.rint((target - start) / step).astype(int)
+
+        frames = np.arange(1, np.abs(steps).max() + 1)[:, np.newaxis]
+        waypoints = start + np.sign(steps) * step * np.minimum(frames, np.abs(steps))
+        if len(waypoints):
+            # the distance need not be a whole number of steps, so finish exactly on the target
+            waypoints[-1] = target
+        return waypoints
+
+    def run_calibration(self):
+        """Draw the next frame of the calibration and schedule the one after it."""
+        try:
+            next(self.calib_steps)
+        except StopIteration:
+            # Done with calibration!
+            self.close_calibration()
+            return
 
-        self.calib_window.after(DELAY, self.run_calibration)
+        self.calib_window.after(CALIBRATION_DELAY, self.run_calibration)
 
     def close_calibration(self):
 
+        # let the last sound finish before closing the audio stream, but don't hang the UI if the write has stalled
+        if self.sound_thread:
+            self.sound_thread.join(timeout=SOUND_WRITE_TIMEOUT)
+        # closing the stream while it is still being written to is unsafe, so if the write has stalled, the stream is
+        # left open to the daemon thread
+        if not (self.sound_thread and self.sound_thread.is_alive()):
+            self.sound_stream.stop_stream()
+            self.sound_stream.close()
+            self.pyaudio.terminate()
+
         # complete calibration
         if not FAKE_CALIBRATION:
             try:
@@ -576,10 +630,7 @@ class MainApp:
         self.wave_samplewidth = wf.getsampwidth()
         self.wave_channels = wf.getnchannels()
         self.wave_framerate = wf.getframerate()
-        data = wf.readframes(1024)
-        while len(data) > 0:
-            self.wavdata += data
-            data = wf.readframes(1024)
+        self.wavdata = wf.readframes(wf.getnframes())
         wf.close()
 
 
@@ -591,42 +642,26 @@ class MainApp:
 
         frames = int(BITRATE * LENGTH)
         padding = frames % int(BITRATE)
-        #wavdata = ''
-
-        for x in range(frames):
-            self.wavdata += chr(int(
-                (
-                    math.sin(x * (FREQ * x/frames) / BITRATE * math.pi) *
-                    math.sin(x * (FREQ * math.cos(x / frames * math.pi)) / BITRATE * math.pi)
-                 ) * 50 + 128  # * 127 + 128 tweak these numbers to increase or decrease the volume
-            ))
-        last = self.wavdata[-1]
-        for x in range(padding):
-            self.wavdata += last  # chr(128)
+
+        x = np.arange(frames, dtype=np.float64)
+        t = x / frames
+        s1 = np.sin(x * (FREQ * t) / BITRATE * np.pi)
+        s2 = np.sin(x * (FREQ * np.cos(t * np.pi)) / BITRATE * np.pi)
+        samples = (s1 * s2 * 50 + 128).astype(np.uint8)  # * 127 + 128 tweak these numbers to increase or decrease the volume
+        self.wavdata = samples.tobytes() + bytes([int(samples[-1])]) * padding
 
         self.wave_samplewidth = 1
         self.wave_channels = 1
         self.wave_framerate = BITRATE
 
-    def sound_callback(self, in_data, frame_count, time_info, status):
-        seg_len = frame_count * self.wave_samplewidth * self.wave_channels
-        if seg_len + self.sound_cursor >= len(self.wavdata):
-            response = pyaudio.paComplete
-        else:
-            response = pyaudio.paContinue
-        out_data = self.wavdata[self.sound_cursor:self.sound_cursor + seg_len]
-        self.sound_cursor += seg_len
-        return out_data, response
-
     def play_sound(self):
-        self.sound_cursor = 0
-        stream = self.pyaudio.open(format=self.pyaudio.get_format_from_width(self.wave_samplewidth),
-                                   channels=self.wave_channels,
-                                   rate=int(self.wave_framerate),
-                                   output=True,
-                                   output_device_index=CALIBRATION_AUDIO_DEVICE,
-                                   stream_callback=self.sound_callback)
-        stream.start_stream()
+        # write the sound from a worker thread to the blocking stream opened by calibrate, so that no Python code
+        # runs on the PortAudio callback thread.
+        # Only one thread writes to the stream at a time; if the previous sound is still playing, skip this one.
+        if self.sound_thread and self.sound_thread.is_alive():
+            return False
+        self.sound_thread = threading.Thread(target=self.sound_stream.write, args=(self.wavdata,), daemon=True)
+        self.sound_thread.start()
         return False
 
     def identify_screens(self):